@@ -1,7 +1,7 @@
 {
     "name": "Ganadería - Contabilidad de Hato",
     "summary": "Gestión ganadera con asignación de costes históricos y trazabilidad contable",
-    "version": "19.0.1.0.0",
+    "version": "19.0.1.1.0",
     "author": "Ganadera",
     "website": "https://example.com",
     "license": "LGPL-3",
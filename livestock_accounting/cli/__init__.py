@@ -0,0 +1 @@
+from . import livestock_recompute
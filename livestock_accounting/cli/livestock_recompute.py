@@ -0,0 +1,106 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import odoo
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+
+def _recompute_chunk(task):
+    dbname, field_names, ids = task
+    with Registry(dbname).cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env["livestock.cattle"].browse(ids)._recompute_stored_fields(field_names)
+    return ids[-1], len(ids)
+
+
+class LivestockRecompute(Command):
+    """Recompute stored fields of livestock.cattle in parallel chunks"""
+
+    name = "livestock_recompute"
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f"{os.path.basename(sys.argv[0])} {self.name}",
+            description=self.__doc__,
+        )
+        parser.add_argument("--fields", default="", help="Comma-separated fields to recompute (default: every stored computed field).")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Animals recomputed and committed per chunk.")
+        parser.add_argument("--processes", type=int, default=max((os.cpu_count() or 2) // 2, 1), help="Number of worker processes.")
+        parser.add_argument("--progress-file", help="JSON file recording the last finished chunk (default: livestock_recompute_<db>.json).")
+        parser.add_argument("--restart", action="store_true", help="Ignore the progress file and start from the first animal.")
+        args, odoo_args = parser.parse_known_args(cmdargs)
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be at least 1")
+        if args.processes < 1:
+            parser.error("--processes must be at least 1")
+        config.parse_config(odoo_args)
+
+        dbname = config["db_name"]
+        if isinstance(dbname, list):
+            dbname = dbname[0] if dbname else None
+        if not dbname:
+            parser.error("a database is required (-d)")
+        progress_file = args.progress_file or f"livestock_recompute_{dbname}.json"
+
+        with Registry(dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            cattle_model = env["livestock.cattle"]
+            recomputable = cattle_model._get_recomputable_field_names()
+            field_names = [name.strip() for name in args.fields.split(",") if name.strip()] or recomputable
+            unknown = [name for name in field_names if name not in recomputable]
+            if unknown:
+                parser.error(f"not stored computed fields of livestock.cattle: {', '.join(unknown)}")
+            progress = self._load_progress(progress_file, dbname, field_names) if not args.restart else {}
+            last_id = progress.get("last_id", 0)
+            cr.execute("SELECT id FROM livestock_cattle WHERE id > %s ORDER BY id", [last_id])
+            ids = [row[0] for row in cr.fetchall()]
+        # Children must open their own connections instead of sharing the parent's sockets.
+        odoo.sql_db.close_all()
+
+        chunks = [ids[index:index + args.chunk_size] for index in range(0, len(ids), args.chunk_size)]
+        _logger.info(
+            "Recomputing %s on %s animals in %s chunks with %s processes (resuming after id %s)",
+            ", ".join(field_names), len(ids), len(chunks), args.processes, last_id,
+        )
+        done = 0
+        start = time.monotonic()
+        with multiprocessing.get_context("fork").Pool(args.processes) as pool:
+            tasks = ((dbname, field_names, chunk) for chunk in chunks)
+            # imap yields in submission order, so every id up to the reported one is committed.
+            for index, (chunk_last_id, count) in enumerate(pool.imap(_recompute_chunk, tasks), start=1):
+                done += count
+                self._save_progress(progress_file, dbname, field_names, chunk_last_id)
+                elapsed = time.monotonic() - start
+                _logger.info(
+                    "Chunk %s/%s done: %s/%s animals, last id %s, %.0f animals/s",
+                    index, len(chunks), done, len(ids), chunk_last_id, done / elapsed if elapsed else 0.0,
+                )
+        if os.path.exists(progress_file):
+            os.remove(progress_file)
+        _logger.info("Recompute finished: %s animals in %.1fs", done, time.monotonic() - start)
+
+    def _load_progress(self, progress_file, dbname, field_names):
+        if not os.path.exists(progress_file):
+            return {}
+        with open(progress_file, encoding="utf-8") as file:
+            progress = json.load(file)
+        if progress.get("database") != dbname or progress.get("fields") != field_names:
+            _logger.warning("Ignoring %s: it belongs to another database or field list", progress_file)
+            return {}
+        return progress
+
+    def _save_progress(self, progress_file, dbname, field_names, last_id):
+        tmp_file = f"{progress_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            json.dump({"database": dbname, "fields": field_names, "last_id": last_id}, file)
+        os.replace(tmp_file, progress_file)
@@ -0,0 +1,12 @@
+from odoo import http
+from odoo.http import request
+
+
+class LivestockSyncController(http.Controller):
+    @http.route("/livestock/sync/pull", type="jsonrpc", auth="user")
+    def sync_pull(self, cursor=None, limit=None):
+        return request.env["livestock.sync.event"]._sync_pull(cursor=cursor, limit=limit)
+
+    @http.route("/livestock/sync/push", type="jsonrpc", auth="user")
+    def sync_push(self, events, device=None):
+        return request.env["livestock.sync.event"]._sync_push(events, device=device)
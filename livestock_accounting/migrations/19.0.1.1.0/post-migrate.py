@@ -0,0 +1,13 @@
+def migrate(cr, version):
+    cr.execute(
+        """
+        UPDATE livestock_cattle c
+           SET retirement_date = COALESCE(
+                   (SELECT MAX(h.date)
+                      FROM livestock_movement_history h
+                     WHERE h.cattle_id = c.id AND h.to_state IN ('retired', 'sold')),
+                   c.write_date::date
+               )
+         WHERE c.state IN ('retired', 'sold') AND c.retirement_date IS NULL
+        """
+    )
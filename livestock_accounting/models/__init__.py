@@ -6,3 +6,4 @@ from . import livestock_cost_history
 from . import livestock_health_event
 
 from . import livestock_movement
+from . import livestock_sync_event
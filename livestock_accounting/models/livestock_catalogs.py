@@ -8,11 +8,27 @@ class LivestockCategory(models.Model):
 
     name = fields.Char(string="Nombre", required=True)
     active = fields.Boolean(default=True)
+    min_weight = fields.Float(string="Peso mínimo (kg)", help="Pesajes por debajo de este valor se marcan para revisión. 0 desactiva el control.")
+    max_weight = fields.Float(string="Peso máximo (kg)", help="Pesajes por encima de este valor se marcan para revisión. 0 desactiva el control.")
+    max_daily_gain = fields.Float(
+        string="Ganancia máxima (kg/día)",
+        default=3.0,
+        help="Ganancia diaria desde el último pesaje a partir de la cual se marca el pesaje. 0 desactiva el control.",
+    )
+    max_daily_loss = fields.Float(
+        string="Pérdida máxima (kg/día)",
+        default=3.0,
+        help="Pérdida diaria desde el último pesaje a partir de la cual se marca el pesaje. 0 desactiva el control.",
+    )
 
     _sql_constraints = [
         ("livestock_category_name_unique", "unique(name)", "La categoría ya existe."),
     ]
 
+    def unlink(self):
+        self.env["livestock.sync.deletion"]._record(self)
+        return super().unlink()
+
 
 class LivestockBreed(models.Model):
     _name = "livestock.breed"
@@ -26,6 +42,10 @@ class LivestockBreed(models.Model):
         ("livestock_breed_name_unique", "unique(name)", "La raza ya existe."),
     ]
 
+    def unlink(self):
+        self.env["livestock.sync.deletion"]._record(self)
+        return super().unlink()
+
 
 class LivestockLocation(models.Model):
     _name = "livestock.location"
@@ -38,3 +58,7 @@ class LivestockLocation(models.Model):
     _sql_constraints = [
         ("livestock_location_name_unique", "unique(name)", "La ubicación o lote ya existe."),
     ]
+
+    def unlink(self):
+        self.env["livestock.sync.deletion"]._record(self)
+        return super().unlink()
@@ -1,15 +1,30 @@
+import logging
+
+import psycopg2
+
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
 
 
 class LivestockCattle(models.Model):
     _name = "livestock.cattle"
     _description = "Ficha de Ganado"
     _inherit = ["mail.thread", "mail.activity.mixin"]
+    _rec_names_search = ["name", "ear_tag", "sequence_code"]
 
-    name = fields.Char(string="Nombre", required=True, tracking=True)
-    sequence_code = fields.Char(string="Código", required=True, copy=False, readonly=True, default=lambda self: _("Nuevo"))
-    ear_tag = fields.Char(string="Arete / Identificación", tracking=True)
+    name = fields.Char(string="Nombre", required=True, tracking=True, index="trigram")
+    sequence_code = fields.Char(
+        string="Código",
+        required=True,
+        copy=False,
+        readonly=True,
+        default=lambda self: _("Nuevo"),
+        index="trigram",
+    )
+    ear_tag = fields.Char(string="Arete / Identificación", tracking=True, index="trigram")
     category_id = fields.Many2one("livestock.category", string="Categoría", required=True, tracking=True)
     breed_id = fields.Many2one("livestock.breed", string="Raza", required=True)
     inclusion_date = fields.Date(string="Fecha de nacimiento / inclusión", required=True, tracking=True)
@@ -35,6 +50,7 @@ class LivestockCattle(models.Model):
         string="Motivo de baja",
     )
     retirement_notes = fields.Text(string="Notas de baja")
+    retirement_date = fields.Date(string="Fecha de baja / venta", tracking=True)
     location_id = fields.Many2one("livestock.location", string="Ubicación / Lote")
     responsible_id = fields.Many2one("res.users", string="Responsable", default=lambda self: self.env.user)
     weight_line_ids = fields.One2many("livestock.weight.control", "cattle_id", string="Control de pesos")
@@ -52,13 +68,50 @@ class LivestockCattle(models.Model):
         ("livestock_cattle_sequence_unique", "unique(sequence_code)", "El código del ganado debe ser único."),
     ]
 
+    def init(self):
+        # The registry only builds the trigram indexes once pg_trgm is available.
+        if self.pool.has_trigram:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except psycopg2.Error:
+            _logger.warning("pg_trgm could not be installed; cattle search will not use trigram indexes.")
+        else:
+            self.pool.has_trigram = True
+
     @api.model_create_multi
     def create(self, vals_list):
         for vals in vals_list:
             if vals.get("sequence_code", _("Nuevo")) == _("Nuevo"):
                 vals["sequence_code"] = self.env["ir.sequence"].next_by_code("livestock.cattle") or _("Nuevo")
+            if vals.get("state") in ("retired", "sold") and not vals.get("retirement_date"):
+                vals["retirement_date"] = fields.Date.context_today(self)
         return super().create(vals_list)
 
+    def write(self, vals):
+        if vals.get("state") == "inventory":
+            vals = dict(vals, retirement_date=False)
+        if vals.get("state") in ("retired", "sold") and not vals.get("retirement_date"):
+            without_date = self.filtered(lambda cattle: not cattle.retirement_date)
+            if without_date:
+                super(LivestockCattle, without_date).write(dict(vals, retirement_date=fields.Date.context_today(self)))
+                return super(LivestockCattle, self - without_date).write(vals)
+        return super().write(vals)
+
+    def unlink(self):
+        self.env["livestock.sync.deletion"]._record(self)
+        return super().unlink()
+
+    @api.model
+    def _get_recomputable_field_names(self):
+        return [name for name, field in self._fields.items() if field.store and field.compute]
+
+    def _recompute_stored_fields(self, field_names):
+        for name in field_names:
+            self.env.add_to_compute(self._fields[name], self)
+        self.flush_recordset(field_names)
+
     @api.depends("weight_line_ids.weight", "weight_line_ids.date")
     def _compute_current_weight(self):
         for cattle in self:
@@ -88,8 +141,71 @@ class LivestockCattle(models.Model):
         for cattle in self:
             cattle.age_years = cattle.age_days / 365.0 if cattle.age_days else 0.0
 
-    @api.constrains("retirement_reason", "state")
+    def _get_weight_days(self, date_from, date_to):
+        # kg·days per animal: weight interpolated between weighings, flat outside them.
+        if not self:
+            return {}
+        self.env["livestock.weight.control"].flush_model(["cattle_id", "date", "weight"])
+        self.flush_recordset(["inclusion_date", "retirement_date"])
+        rows = self.env.execute_query(
+            SQL(
+                """
+                WITH bounds AS (
+                    SELECT c.id AS cattle_id,
+                           GREATEST(%(date_from)s::date, c.inclusion_date) AS lo,
+                           LEAST(
+                               %(date_to)s::date,
+                               CASE WHEN c.state <> 'inventory' THEN c.retirement_date END
+                           ) + 1 AS hi
+                      FROM livestock_cattle c
+                     WHERE c.id = ANY(%(cattle_ids)s)
+                ),
+                points AS (
+                    SELECT DISTINCT ON (w.cattle_id, w.date) w.cattle_id, w.date, w.weight
+                      FROM livestock_weight_control w
+                      JOIN bounds b ON b.cattle_id = w.cattle_id AND b.hi > b.lo
+                  ORDER BY w.cattle_id, w.date, w.id DESC
+                ),
+                knots AS (
+                    SELECT cattle_id, date AS x0, weight AS y0,
+                           LEAD(date) OVER win AS x1, LEAD(weight) OVER win AS y1,
+                           ROW_NUMBER() OVER win AS rn
+                      FROM points
+                    WINDOW win AS (PARTITION BY cattle_id ORDER BY date)
+                ),
+                segments AS (
+                    SELECT cattle_id, x0, y0, x1, y1 FROM knots WHERE x1 IS NOT NULL
+                     UNION ALL
+                    SELECT k.cattle_id, b.lo, k.y0, k.x0, k.y0
+                      FROM knots k JOIN bounds b ON b.cattle_id = k.cattle_id
+                     WHERE k.rn = 1 AND b.lo < k.x0
+                     UNION ALL
+                    SELECT k.cattle_id, k.x0, k.y0, b.hi, k.y0
+                      FROM knots k JOIN bounds b ON b.cattle_id = k.cattle_id
+                     WHERE k.x1 IS NULL AND k.x0 < b.hi
+                ),
+                clipped AS (
+                    SELECT s.cattle_id, s.x0, s.y0, s.x1, s.y1,
+                           GREATEST(s.x0, b.lo) AS u, LEAST(s.x1, b.hi) AS v
+                      FROM segments s JOIN bounds b ON b.cattle_id = s.cattle_id
+                )
+                SELECT cattle_id,
+                       SUM((v - u) * (2 * y0 + (y1 - y0) * ((u - x0) + (v - x0))::float / (x1 - x0)) / 2)
+                  FROM clipped
+                 WHERE v > u
+              GROUP BY cattle_id
+                """,
+                date_from=date_from,
+                date_to=date_to,
+                cattle_ids=self.ids,
+            )
+        )
+        return dict(rows)
+
+    @api.constrains("retirement_reason", "retirement_date", "state")
     def _check_retirement_reason(self):
         for cattle in self:
             if cattle.state in ("retired", "sold") and not cattle.retirement_reason:
                 raise ValidationError(_("Debe indicar un motivo cuando el ganado está dado de baja o vendido."))
+            if cattle.state in ("retired", "sold") and not cattle.retirement_date:
+                raise ValidationError(_("Debe indicar la fecha de baja o venta del ganado."))
@@ -26,7 +26,7 @@ class LivestockCostHistory(models.Model):
         readonly=True,
     )
     method = fields.Selection(
-        [("equal", "Igualitario"), ("weight", "Por peso"), ("age", "Por edad")],
+        [("equal", "Igualitario"), ("weight", "Por peso"), ("age", "Por edad"), ("kg_days", "Por kg·día")],
         string="Método de asignación",
         required=True,
     )
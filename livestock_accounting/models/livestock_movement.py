@@ -1,5 +1,6 @@
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
+from odoo.tools import SQL, format_date
 
 
 class LivestockMovement(models.Model):
@@ -16,6 +17,7 @@ class LivestockMovement(models.Model):
             ("health", "Registro masivo de sanidad"),
             ("retirement", "Baja masiva del hato"),
             ("reclassification", "Reclasificación de categoría"),
+            ("sale", "Venta masiva con factura"),
         ],
         string="Tipo de movimiento",
         required=True,
@@ -65,6 +67,29 @@ class LivestockMovement(models.Model):
     )
     retirement_notes = fields.Text(string="Notas de baja")
     new_category_id = fields.Many2one("livestock.category", string="Nueva categoría")
+    partner_id = fields.Many2one("res.partner", string="Cliente")
+    sale_price_per_kg = fields.Monetary(string="Precio de venta por kg")
+    sale_invoice_grouping = fields.Selection(
+        [("cattle", "Una línea por animal"), ("category", "Una línea por categoría")],
+        string="Detalle de factura",
+        default="cattle",
+    )
+    currency_id = fields.Many2one("res.currency", string="Moneda", default=lambda self: self.env.company.currency_id, required=True)
+    invoice_id = fields.Many2one("account.move", string="Factura de venta", readonly=True, copy=False)
+    company_currency_id = fields.Many2one(
+        "res.currency",
+        string="Moneda de la compañía",
+        default=lambda self: self.env.company.currency_id,
+        required=True,
+        readonly=True,
+    )
+    sale_cost_total = fields.Monetary(
+        string="Coste de ventas",
+        currency_field="company_currency_id",
+        readonly=True,
+        copy=False,
+    )
+    has_weight_anomalies = fields.Boolean(string="Pesajes a revisar", compute="_compute_has_weight_anomalies")
 
     movement_history_ids = fields.One2many(
         "livestock.movement.history",
@@ -80,7 +105,21 @@ class LivestockMovement(models.Model):
                 vals["name"] = self.env["ir.sequence"].next_by_code("livestock.movement") or _("Nuevo")
         return super().create(vals_list)
 
-    @api.constrains("movement_type", "weight_line_ids", "health_event_type", "health_description", "retirement_reason", "new_category_id")
+    @api.depends("weight_line_ids.weight_anomaly")
+    def _compute_has_weight_anomalies(self):
+        for movement in self:
+            movement.has_weight_anomalies = any(movement.weight_line_ids.mapped("weight_anomaly"))
+
+    @api.constrains(
+        "movement_type",
+        "weight_line_ids",
+        "health_event_type",
+        "health_description",
+        "retirement_reason",
+        "new_category_id",
+        "partner_id",
+        "sale_price_per_kg",
+    )
     def _check_required_by_type(self):
         for movement in self:
             if movement.movement_type == "weight":
@@ -96,9 +135,16 @@ class LivestockMovement(models.Model):
                 raise UserError(_("Debe indicar el motivo para la baja masiva."))
             if movement.movement_type == "reclassification" and not movement.new_category_id:
                 raise UserError(_("Debe indicar la nueva categoría para la reclasificación."))
+            if movement.movement_type == "sale" and (not movement.partner_id or movement.sale_price_per_kg <= 0):
+                raise UserError(_("Debe indicar el cliente y un precio por kg mayor que cero para la venta."))
 
     def action_apply(self):
-        for movement in self:
+        flagged_movements = self.browse()
+        if not self.env.context.get("livestock_skip_weight_screening"):
+            flagged_movements = self.filtered(
+                lambda movement: movement.movement_type == "weight" and movement.state == "draft"
+            )._screen_weight_lines()
+        for movement in self - flagged_movements:
             if movement.state == "applied":
                 raise UserError(_("El movimiento %s ya fue aplicado.") % movement.name)
             target_cattle = movement.cattle_ids
@@ -110,17 +156,85 @@ class LivestockMovement(models.Model):
             movement._apply_to_cattle()
             movement.state = "applied"
 
+    def action_apply_with_weight_anomalies(self):
+        return self.with_context(livestock_skip_weight_screening=True).action_apply()
+
+    def _screen_weight_lines(self):
+        # Returns the movements left in draft because some line needs confirmation.
+        if not self:
+            return self
+        self.env.flush_all()
+        rows = self.env.execute_query(
+            SQL(
+                """
+                SELECT l.id, prev.weight, prev.date, daily.change,
+                       c.min_weight, c.max_weight,
+                       c.max_daily_gain > 0 AND daily.change > c.max_daily_gain,
+                       c.max_daily_loss > 0 AND -daily.change > c.max_daily_loss,
+                       (c.min_weight > 0 AND l.weight < c.min_weight) OR (c.max_weight > 0 AND l.weight > c.max_weight)
+                  FROM livestock_movement_weight_line l
+                  JOIN livestock_movement m ON m.id = l.movement_id
+                  JOIN livestock_cattle a ON a.id = l.cattle_id
+                  JOIN livestock_category c ON c.id = a.category_id
+             LEFT JOIN LATERAL (
+                           SELECT w.weight, w.date
+                             FROM livestock_weight_control w
+                            WHERE w.cattle_id = l.cattle_id AND w.date <= m.date
+                         ORDER BY w.date DESC, w.id DESC
+                            LIMIT 1
+                       ) prev ON TRUE
+             LEFT JOIN LATERAL (
+                           SELECT (l.weight - prev.weight) / GREATEST(m.date - prev.date, 1) AS change
+                       ) daily ON TRUE
+                 WHERE l.movement_id = ANY(%s)
+                """,
+                self.ids,
+            )
+        )
+        reasons_by_line_id = {}
+        for line_id, last_weight, last_date, change, min_weight, max_weight, too_much_gain, too_much_loss, out_of_range in rows:
+            reasons = []
+            if too_much_gain or too_much_loss:
+                reasons.append(
+                    _("%(change)+.2f kg/día desde %(weight)s kg el %(date)s")
+                    % {"change": change, "weight": last_weight, "date": format_date(self.env, last_date)}
+                )
+            if out_of_range:
+                reasons.append(_("fuera del rango de la categoría (%s - %s kg)") % (min_weight or 0, max_weight or "∞"))
+            if reasons:
+                reasons_by_line_id[line_id] = "; ".join(reasons)
+
+        lines = self.weight_line_ids
+        flagged_lines = lines.browse(list(reasons_by_line_id))
+        (lines - flagged_lines).filtered("weight_anomaly").write({"weight_anomaly": False, "weight_anomaly_reason": False})
+        if flagged_lines:
+            flagged_lines.write({"weight_anomaly": True})
+            self.env.execute_query(
+                SQL(
+                    """
+                    UPDATE livestock_movement_weight_line l
+                       SET weight_anomaly_reason = v.reason
+                      FROM (VALUES %s) AS v(id, reason)
+                     WHERE l.id = v.id
+                    """,
+                    SQL(", ").join(SQL("(%s, %s)", line_id, reason) for line_id, reason in reasons_by_line_id.items()),
+                )
+            )
+            flagged_lines.invalidate_recordset(["weight_anomaly_reason"])
+        return flagged_lines.mapped("movement_id")
+
     def _apply_to_cattle(self):
         self.ensure_one()
-        history_values = []
         target_cattle = self.cattle_ids
         weight_by_cattle_id = {}
         if self.movement_type == "weight":
             target_cattle = self.weight_line_ids.mapped("cattle_id")
             weight_by_cattle_id = {line.cattle_id.id: line.weight for line in self.weight_line_ids}
+        elif self.movement_type == "reclassification":
+            target_cattle = target_cattle.filtered(lambda cattle: cattle.category_id != self.new_category_id)
 
-        for cattle in target_cattle:
-            vals = {
+        history_values = [
+            {
                 "movement_id": self.id,
                 "cattle_id": cattle.id,
                 "date": self.date,
@@ -129,21 +243,28 @@ class LivestockMovement(models.Model):
                 "from_category_id": cattle.category_id.id,
                 "from_state": cattle.state,
             }
+            for cattle in target_cattle
+        ]
+        extra_values = {}
 
-            if self.movement_type == "weight":
-                weight = weight_by_cattle_id.get(cattle.id, 0.0)
-                self.env["livestock.weight.control"].create(
+        if self.movement_type == "weight":
+            self.env["livestock.weight.control"].create(
+                [
                     {
                         "cattle_id": cattle.id,
                         "date": self.date,
-                        "weight": weight,
+                        "weight": weight_by_cattle_id.get(cattle.id, 0.0),
                         "notes": self.notes,
                     }
-                )
-                vals.update({"weight": weight})
+                    for cattle in target_cattle
+                ]
+            )
+            for vals in history_values:
+                vals["weight"] = weight_by_cattle_id.get(vals["cattle_id"], 0.0)
 
-            elif self.movement_type == "health":
-                self.env["livestock.health.event"].create(
+        elif self.movement_type == "health":
+            self.env["livestock.health.event"].create(
+                [
                     {
                         "cattle_id": cattle.id,
                         "date": self.date,
@@ -152,41 +273,114 @@ class LivestockMovement(models.Model):
                         "veterinarian": self.health_veterinarian,
                         "notes": self.notes,
                     }
-                )
-                vals.update(
-                    {
-                        "health_event_type": self.health_event_type,
-                        "health_description": self.health_description,
-                        "health_veterinarian": self.health_veterinarian,
-                    }
-                )
+                    for cattle in target_cattle
+                ]
+            )
+            extra_values = {
+                "health_event_type": self.health_event_type,
+                "health_description": self.health_description,
+                "health_veterinarian": self.health_veterinarian,
+            }
 
-            elif self.movement_type == "retirement":
-                cattle.write(
-                    {
-                        "state": "retired",
-                        "retirement_reason": self.retirement_reason,
-                        "retirement_notes": self.retirement_notes or self.notes,
-                    }
-                )
-                vals.update(
-                    {
-                        "retirement_reason": self.retirement_reason,
-                        "retirement_notes": self.retirement_notes or self.notes,
-                    }
-                )
+        elif self.movement_type == "retirement":
+            extra_values = {
+                "retirement_reason": self.retirement_reason,
+                "retirement_notes": self.retirement_notes or self.notes,
+            }
+            target_cattle.write(dict(extra_values, state="retired", retirement_date=self.date))
 
-            elif self.movement_type == "reclassification":
-                if cattle.category_id == self.new_category_id:
-                    continue
-                cattle.category_id = self.new_category_id
-                vals.update({"to_category_id": self.new_category_id.id})
+        elif self.movement_type == "reclassification":
+            target_cattle.write({"category_id": self.new_category_id.id})
 
+        elif self.movement_type == "sale":
+            cattle_not_in_inventory = target_cattle.filtered(lambda cattle: cattle.state != "inventory")
+            if cattle_not_in_inventory:
+                raise UserError(
+                    _("Los siguientes animales no están en inventario: %s")
+                    % ", ".join(cattle_not_in_inventory.mapped("display_name"))
+                )
+            sale_values_by_cattle_id = self._invoice_sale(target_cattle)
+            for vals in history_values:
+                vals.update(sale_values_by_cattle_id[vals["cattle_id"]])
+            extra_values = {
+                "retirement_reason": "venta",
+                "retirement_notes": self.notes or _("Venta %s") % self.name,
+            }
+            target_cattle.write(dict(extra_values, state="sold", retirement_date=self.date))
+
+        for cattle, vals in zip(target_cattle, history_values):
+            vals.update(extra_values)
             vals.update({"to_category_id": cattle.category_id.id, "to_state": cattle.state})
-            history_values.append(vals)
+        self.env["livestock.movement.history"].create(history_values)
+
+    def _invoice_sale(self, cattle):
+        self.ensure_one()
+        cattle_without_weight = cattle.filtered(lambda animal: animal.current_weight <= 0)
+        if cattle_without_weight:
+            raise UserError(
+                _("Los siguientes animales no tienen peso registrado: %s")
+                % ", ".join(cattle_without_weight.mapped("display_name"))
+            )
+        cost_groups = self.env["livestock.cost.history"]._read_group(
+            [("cattle_id", "in", cattle.ids)],
+            ["cattle_id"],
+            ["allocated_amount:sum"],
+        )
+        cost_by_cattle_id = {animal.id: amount for animal, amount in cost_groups}
+
+        if self.sale_invoice_grouping == "category":
+            totals_by_category = {}
+            for animal in cattle:
+                totals = totals_by_category.setdefault(animal.category_id, {"weight": 0.0, "count": 0})
+                totals["weight"] += animal.current_weight
+                totals["count"] += 1
+            invoice_lines = [
+                {
+                    "name": _("%s - %s animales") % (category.name, totals["count"]),
+                    "quantity": totals["weight"],
+                    "price_unit": self.sale_price_per_kg,
+                }
+                for category, totals in totals_by_category.items()
+            ]
+        else:
+            invoice_lines = [
+                {
+                    "name": "[%s] %s" % (animal.sequence_code, animal.name),
+                    "quantity": animal.current_weight,
+                    "price_unit": self.sale_price_per_kg,
+                }
+                for animal in cattle
+            ]
 
-        for values in history_values:
-            self.env["livestock.movement.history"].create(values)
+        self.invoice_id = self.env["account.move"].create(
+            {
+                "move_type": "out_invoice",
+                "partner_id": self.partner_id.id,
+                "invoice_date": self.date,
+                "invoice_origin": self.name,
+                "currency_id": self.currency_id.id,
+                "invoice_line_ids": [fields.Command.create(vals) for vals in invoice_lines],
+            }
+        )
+        self.sale_cost_total = sum(cost_by_cattle_id.values())
+        return {
+            animal.id: {
+                "weight": animal.current_weight,
+                "sale_amount": animal.current_weight * self.sale_price_per_kg,
+                "cost_of_goods": cost_by_cattle_id.get(animal.id, 0.0),
+            }
+            for animal in cattle
+        }
+
+    def action_open_invoice(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Factura de venta"),
+            "res_model": "account.move",
+            "res_id": self.invoice_id.id,
+            "view_mode": "form",
+        }
 
 
 class LivestockMovementHistory(models.Model):
@@ -203,6 +397,7 @@ class LivestockMovementHistory(models.Model):
             ("health", "Registro masivo de sanidad"),
             ("retirement", "Baja masiva del hato"),
             ("reclassification", "Reclasificación de categoría"),
+            ("sale", "Venta masiva con factura"),
         ],
         string="Tipo",
         required=True,
@@ -247,6 +442,10 @@ class LivestockMovementHistory(models.Model):
         string="Motivo de baja",
     )
     retirement_notes = fields.Text(string="Notas de baja")
+    currency_id = fields.Many2one(related="movement_id.currency_id", string="Moneda", readonly=True)
+    sale_amount = fields.Monetary(string="Importe de venta")
+    company_currency_id = fields.Many2one(related="movement_id.company_currency_id", string="Moneda de la compañía", readonly=True)
+    cost_of_goods = fields.Monetary(string="Coste de ventas", currency_field="company_currency_id")
 
 
 class LivestockMovementWeightLine(models.Model):
@@ -261,6 +460,8 @@ class LivestockMovementWeightLine(models.Model):
         domain="[('state', '=', 'inventory')]",
     )
     weight = fields.Float(string="Peso (kg)", required=True)
+    weight_anomaly = fields.Boolean(string="A revisar", readonly=True, copy=False)
+    weight_anomaly_reason = fields.Char(string="Motivo de revisión", readonly=True, copy=False)
 
     _sql_constraints = [
         (
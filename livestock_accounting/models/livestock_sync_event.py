@@ -0,0 +1,269 @@
+from collections import defaultdict
+from datetime import datetime
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+SYNC_PULL_MODELS = {
+    "cattle": (
+        "livestock.cattle",
+        ["name", "sequence_code", "ear_tag", "category_id", "breed_id", "location_id", "inclusion_date", "state", "current_weight"],
+    ),
+    "category": ("livestock.category", ["name", "active"]),
+    "breed": ("livestock.breed", ["name", "active"]),
+    "location": ("livestock.location", ["name", "active"]),
+}
+SYNC_PULL_DEFAULT_LIMIT = 2000
+SYNC_PULL_MAX_LIMIT = 10000
+
+
+class LivestockSyncEvent(models.Model):
+    _name = "livestock.sync.event"
+    _description = "Evento sincronizado desde dispositivo de campo"
+    _order = "id desc"
+
+    sync_key = fields.Char(string="Clave de idempotencia", required=True, readonly=True, index=True)
+    device = fields.Char(string="Dispositivo", readonly=True)
+    event_type = fields.Selection(
+        [("weight", "Peso"), ("health", "Sanidad")],
+        string="Tipo",
+        required=True,
+        readonly=True,
+    )
+    cattle_id = fields.Many2one("livestock.cattle", string="Ganado", required=True, readonly=True, ondelete="cascade")
+    date = fields.Date(string="Fecha", required=True, readonly=True)
+    movement_id = fields.Many2one("livestock.movement", string="Movimiento", readonly=True, ondelete="set null")
+
+    _sql_constraints = [
+        ("livestock_sync_event_key_unique", "unique(sync_key)", "La clave de sincronización ya fue registrada."),
+    ]
+
+    @api.model
+    def _sync_pull(self, cursor=None, limit=None):
+        cursor = self._sync_check_cursor(cursor)
+        limit = max(min(int(limit or SYNC_PULL_DEFAULT_LIMIT), SYNC_PULL_MAX_LIMIT), 1)
+        result = {"cursor": cursor, "has_more": False, "data": {}}
+        self.env.flush_all()
+        horizon = self._sync_horizon()
+        for key, (model_name, field_names) in SYNC_PULL_MODELS.items():
+            model = self.env[model_name].with_context(active_test=False)
+            rows = self._sync_page(model._table, SQL("TRUE"), cursor.get(key), horizon, limit)
+            records = model.browse([row[0] for row in rows]).exists()
+            values_by_id = {values["id"]: values for values in records.read(field_names, load=None)}
+            deletion_key = f"{key}_deleted"
+            deletion_rows = self._sync_page(
+                self.env["livestock.sync.deletion"]._table,
+                SQL("model = %s", model_name),
+                cursor.get(deletion_key),
+                horizon,
+                limit,
+                date_column="create_date",
+                extra_column=SQL("res_id"),
+            )
+            result["data"][key] = {
+                "fields": ["id"] + field_names,
+                "rows": [
+                    [record_id] + [values_by_id[record_id][name] for name in field_names]
+                    for record_id, _write_date in rows
+                    if record_id in values_by_id
+                ],
+                "deleted": [row[2] for row in deletion_rows],
+            }
+            for page_key, page_rows in ((key, rows), (deletion_key, deletion_rows)):
+                if page_rows:
+                    cursor[page_key] = [str(page_rows[-1][1]), page_rows[-1][0]]
+                if len(page_rows) == limit:
+                    result["has_more"] = True
+        return result
+
+    @api.model
+    def _sync_check_cursor(self, cursor):
+        if not cursor:
+            return {}
+        if not isinstance(cursor, dict):
+            raise UserError(_("El cursor de sincronización debe ser un objeto."))
+        for key, watermark in cursor.items():
+            if (
+                not isinstance(watermark, list)
+                or len(watermark) != 2
+                or not isinstance(watermark[0], str)
+                or not isinstance(watermark[1], int)
+            ):
+                raise UserError(_("Marca de agua inválida para %s: debe ser [fecha, id].") % key)
+            try:
+                datetime.fromisoformat(watermark[0])
+            except ValueError:
+                raise UserError(_("Fecha inválida en la marca de agua de %s: %s") % (key, watermark[0]))
+        return dict(cursor)
+
+    @api.model
+    def _sync_horizon(self):
+        # Oldest start among transactions this snapshot cannot see yet, or our own start.
+        return self.env.execute_query(
+            SQL(
+                """
+                SELECT MIN(a.xact_start) AT TIME ZONE 'UTC'
+                  FROM pg_stat_activity a
+                 WHERE a.pid = pg_backend_pid()
+                    OR (
+                        a.datname = current_database()
+                        AND a.backend_type = 'client backend'
+                        AND a.backend_xid::text::bigint IN (
+                            SELECT mod(xip::text::bigint, 4294967296)
+                              FROM pg_snapshot_xip(pg_current_snapshot()) AS xip
+                        )
+                    )
+                """
+            )
+        )[0][0]
+
+    @api.model
+    def _sync_page(self, table, where, watermark, horizon, limit, date_column="write_date", extra_column=None):
+        conditions = [where, SQL("%s < %s", SQL.identifier(date_column), horizon)]
+        if watermark:
+            conditions.append(SQL("(%s, id) > (%s::timestamp, %s)", SQL.identifier(date_column), watermark[0], watermark[1]))
+        columns = [SQL("id"), SQL.identifier(date_column)]
+        if extra_column:
+            columns.append(extra_column)
+        return self.env.execute_query(
+            SQL(
+                "SELECT %s FROM %s WHERE %s ORDER BY %s, id LIMIT %s",
+                SQL(", ").join(columns),
+                SQL.identifier(table),
+                SQL(" AND ").join(conditions),
+                SQL.identifier(date_column),
+                limit,
+            )
+        )
+
+    @api.model
+    def _sync_push(self, events, device=None):
+        results = []
+        valid_events = [event for event in events if isinstance(event, dict)]
+        keys = [event.get("key") for event in valid_events if isinstance(event.get("key"), str) and event.get("key")]
+        known_keys = set(self.search([("sync_key", "in", keys)]).mapped("sync_key"))
+        cattle_ids = {event.get("cattle_id") for event in valid_events if isinstance(event.get("cattle_id"), int)}
+        cattle_in_inventory = set(
+            self.env["livestock.cattle"].search([("id", "in", list(cattle_ids)), ("state", "=", "inventory")]).ids
+        )
+
+        accepted = []
+        for event in events:
+            if not isinstance(event, dict):
+                results.append({"key": None, "status": "rejected", "error": _("El evento debe ser un objeto JSON.")})
+                continue
+            key = event.get("key")
+            result = {"key": key}
+            results.append(result)
+            if not isinstance(key, str) or not key:
+                result.update(status="rejected", error=_("El evento no tiene clave de idempotencia."))
+                continue
+            if key in known_keys:
+                result["status"] = "duplicate"
+                continue
+            error = self._sync_check_event(event, cattle_in_inventory)
+            if error:
+                result.update(status="rejected", error=error)
+                continue
+            known_keys.add(key)
+            result["status"] = "applied"
+            accepted.append((event, result))
+
+        # A movement cannot repeat an animal: repeated readings go to another bucket.
+        buckets = defaultdict(list)
+        for event, result in accepted:
+            group_key = (event["type"], event["date"], None, None, None)
+            if event["type"] == "health":
+                group_key = (event["type"], event["date"], event["event_type"], event["description"], event.get("veterinarian"))
+            for bucket in buckets[group_key]:
+                if event["cattle_id"] not in bucket["cattle_ids"]:
+                    break
+            else:
+                bucket = {"cattle_ids": set(), "items": []}
+                buckets[group_key].append(bucket)
+            bucket["cattle_ids"].add(event["cattle_id"])
+            bucket["items"].append((event, result))
+
+        movement_values = []
+        bucket_items = []
+        notes = _("Sincronizado desde dispositivo %s") % device if device else _("Sincronizado desde dispositivo de campo")
+        for (event_type, date, health_event_type, description, veterinarian), group_buckets in buckets.items():
+            for bucket in group_buckets:
+                vals = {"movement_type": event_type, "date": date, "notes": notes}
+                if event_type == "weight":
+                    vals["weight_line_ids"] = [
+                        fields.Command.create({"cattle_id": event["cattle_id"], "weight": event["weight"]})
+                        for event, _result in bucket["items"]
+                    ]
+                else:
+                    vals.update(
+                        {
+                            "cattle_ids": [fields.Command.set(list(bucket["cattle_ids"]))],
+                            "health_event_type": health_event_type,
+                            "health_description": description,
+                            "health_veterinarian": veterinarian,
+                        }
+                    )
+                movement_values.append(vals)
+                bucket_items.append(bucket["items"])
+
+        if not movement_values:
+            return {"results": results}
+        movements = self.env["livestock.movement"].create(movement_values)
+        movements.action_apply()
+
+        sync_values = []
+        for movement, items in zip(movements, bucket_items):
+            for event, result in items:
+                result["movement"] = movement.name
+                if movement.state != "applied":
+                    result["status"] = "pending_review"
+                sync_values.append(
+                    {
+                        "sync_key": event["key"],
+                        "device": device,
+                        "event_type": event["type"],
+                        "cattle_id": event["cattle_id"],
+                        "date": event["date"],
+                        "movement_id": movement.id,
+                    }
+                )
+        self.create(sync_values)
+        return {"results": results}
+
+    @api.model
+    def _sync_check_event(self, event, cattle_in_inventory):
+        if not isinstance(event.get("type"), str) or event["type"] not in ("weight", "health"):
+            return _("Tipo de evento no soportado: %s") % event.get("type")
+        if not isinstance(event.get("cattle_id"), int) or event["cattle_id"] not in cattle_in_inventory:
+            return _("El animal %s no existe o no está en inventario.") % event.get("cattle_id")
+        if not event.get("date"):
+            return _("El evento debe indicar la fecha.")
+        try:
+            fields.Date.to_date(event["date"])
+        except (TypeError, ValueError):
+            return _("Fecha inválida: %s") % event["date"]
+        if event["type"] == "weight":
+            if not isinstance(event.get("weight"), (int, float)) or event["weight"] <= 0:
+                return _("El peso debe ser mayor que cero.")
+        else:
+            health_types = dict(self.env["livestock.health.event"]._fields["event_type"].selection)
+            if event.get("event_type") not in health_types or not isinstance(event.get("description"), str) or not event["description"]:
+                return _("Debe indicar tipo y descripción válidos para el evento sanitario.")
+            if not isinstance(event.get("veterinarian") or "", str):
+                return _("El veterinario debe ser un texto.")
+        return False
+
+
+class LivestockSyncDeletion(models.Model):
+    _name = "livestock.sync.deletion"
+    _description = "Registro eliminado para sincronización"
+    _order = "id desc"
+
+    model = fields.Char(string="Modelo", required=True, readonly=True, index=True)
+    res_id = fields.Integer(string="ID", required=True, readonly=True)
+
+    @api.model
+    def _record(self, records):
+        self.sudo().create([{"model": records._name, "res_id": record_id} for record_id in records.ids])
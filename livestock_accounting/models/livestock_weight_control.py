@@ -1,5 +1,6 @@
 from odoo import api, fields, models
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import create_index
 
 
 class LivestockWeightControl(models.Model):
@@ -12,6 +13,14 @@ class LivestockWeightControl(models.Model):
     weight = fields.Float(string="Peso (kg)", required=True)
     notes = fields.Char(string="Notas")
 
+    def init(self):
+        create_index(
+            self.env.cr,
+            "livestock_weight_control_cattle_date_index",
+            self._table,
+            ["cattle_id", "date DESC", "id DESC"],
+        )
+
     @api.constrains("weight")
     def _check_weight_positive(self):
         for line in self:
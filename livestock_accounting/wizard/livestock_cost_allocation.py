@@ -10,7 +10,11 @@ class LivestockCostAllocation(models.Model):
     name = fields.Char(string="Referencia", default=lambda self: _("Nuevo"), readonly=True, copy=False)
     date = fields.Date(string="Fecha", required=True, default=fields.Date.context_today)
     company_id = fields.Many2one("res.company", default=lambda self: self.env.company, required=True)
-    cattle_ids = fields.Many2many("livestock.cattle", string="Ganado a costear", domain="[('state','=','inventory')]")
+    cattle_ids = fields.Many2many(
+        "livestock.cattle",
+        string="Ganado a costear",
+        domain="[] if method == 'kg_days' else [('state','=','inventory')]",
+    )
     allocation_line_ids = fields.One2many("livestock.cost.allocation.line", "allocation_id", string="Líneas disponibles")
     invoice_line_ids = fields.Many2many(
         "account.move.line",
@@ -19,7 +23,7 @@ class LivestockCostAllocation(models.Model):
         store=False,
     )
     method = fields.Selection(
-        [("equal", "Igual para todos"), ("weight", "Por peso"), ("age", "Por edad")],
+        [("equal", "Igual para todos"), ("weight", "Por peso"), ("age", "Por edad"), ("kg_days", "Por kg·día del periodo")],
         string="Método de asignación",
         required=True,
         default="equal",
@@ -144,19 +148,25 @@ class LivestockCostAllocation(models.Model):
         if total <= 0:
             raise UserError(_("El total a asignar debe ser mayor que cero."))
 
-        factors = self._get_allocation_factors()
-        factor_sum = sum(factors.values())
-        if factor_sum <= 0:
-            raise UserError(_("No se pudo calcular una base válida para el método de asignación."))
-
+        factors_by_period = {}
+        history_values = []
         for line in self.invoice_line_ids:
             eligible_cattle = self.cattle_ids.filtered(lambda c: not line.livestock_category_id or c.category_id == line.livestock_category_id)
             if not eligible_cattle:
                 continue
-            eligible_sum = sum(factors[c.id] for c in eligible_cattle)
+            period = self._get_service_period(line) if self.method == "kg_days" else None
+            if period not in factors_by_period:
+                factors_by_period[period] = self._get_allocation_factors(period)
+            factors = factors_by_period[period]
+            eligible_sum = sum(factors.get(c.id, 0.0) for c in eligible_cattle)
+            if eligible_sum <= 0:
+                raise UserError(
+                    _("No se pudo calcular una base válida para el método de asignación en la línea %s.")
+                    % line.display_name
+                )
             for cattle in eligible_cattle:
-                amount = line.price_subtotal * (factors[cattle.id] / eligible_sum)
-                self.env["livestock.cost.history"].create(
+                amount = line.price_subtotal * (factors.get(cattle.id, 0.0) / eligible_sum)
+                history_values.append(
                     {
                         "cattle_id": cattle.id,
                         "move_line_id": line.id,
@@ -167,11 +177,42 @@ class LivestockCostAllocation(models.Model):
                         "note": _("Asignación %s") % self.name,
                     }
                 )
+        self.env["livestock.cost.history"].create(history_values)
 
         self.state = "done"
 
-    def _get_allocation_factors(self):
+    def action_load_period_cattle(self):
+        self.ensure_one()
+        if not self.invoice_line_ids:
+            raise UserError(_("Debe seleccionar al menos una línea de factura."))
+        cattle = self.env["livestock.cattle"]
+        searched = set()
+        for line in self.invoice_line_ids:
+            date_from, date_to = self._get_service_period(line)
+            search_key = (date_from, date_to, line.livestock_category_id.id)
+            if search_key in searched:
+                continue
+            searched.add(search_key)
+            domain = [
+                ("inclusion_date", "<=", date_to),
+                "|",
+                ("retirement_date", "=", False),
+                ("retirement_date", ">=", date_from),
+            ]
+            if line.livestock_category_id:
+                domain.append(("category_id", "=", line.livestock_category_id.id))
+            cattle |= self.env["livestock.cattle"].search(domain)
+        self.cattle_ids = [fields.Command.set((self.cattle_ids | cattle).ids)]
+
+    def _get_service_period(self, move_line):
+        date_from = move_line.deferred_start_date or move_line.date
+        date_to = move_line.deferred_end_date or move_line.date
+        return date_from, date_to
+
+    def _get_allocation_factors(self, period=None):
         self.ensure_one()
+        if self.method == "kg_days":
+            return self.cattle_ids._get_weight_days(*period)
         factors = {}
         for cattle in self.cattle_ids:
             if self.method == "equal":